@@ -0,0 +1,13 @@
+# scripts/reextract.py
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+from src.archive import reextract_archive
+
+def main():
+    df = reextract_archive("output/archive")
+    print(df)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# src/archive.py
+import json
+import math
+import os
+import re
+from datetime import datetime
+from multiprocessing import Pool
+from pathlib import Path
+from typing import List, Optional
+import pandas as pd
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from .extractors import RESULT_COLUMNS, extract_listing_fields, extract_detail_fields
+
+LISTING_PAGE = "listing.html"
+DETAIL_PAGE = "detail.html"
+RUN_INFO = "run.json"
+
+def new_run_dir(archive_dir: str, adults: Optional[int] = None) -> str:
+    """Return a fresh directory for one scraping run inside the archive.
+
+    Every run gets its own directory, so reusing archive_dir never mixes pages
+    of different runs.
+
+    Args:
+        archive_dir (str): Root directory of the archive.
+        adults (Optional[int]): Number of adults in the search, needed to re-extract 'CardPricePerPerson'.
+
+    Returns:
+        str: Path such as "output/archive/run_20250412_101500".
+    """
+    base = Path(archive_dir) / f"run_{datetime.now():%Y%m%d_%H%M%S}"
+    run_dir = base
+    suffix = 1
+    while run_dir.exists():
+        run_dir = base.with_name(f"{base.name}_{suffix}")
+        suffix += 1
+    run_dir.mkdir(parents=True)
+    (run_dir / RUN_INFO).write_text(json.dumps({"adults": adults}), encoding='utf-8')
+    return str(run_dir)
+
+def page_key(index: int, base_url: str) -> str:
+    """Build the archive directory name for a property.
+
+    Args:
+        index (int): Position of the property in the scrape, used to keep the original order.
+        base_url (str): Property URL without query parameters.
+
+    Returns:
+        str: Directory name such as "00012_hotel-name.pl".
+    """
+    slug = base_url.rstrip('/').rsplit('/', 1)[-1]
+    slug = re.sub(r'\.html$', '', slug)
+    slug = re.sub(r'[^A-Za-z0-9._-]+', '-', slug) or "property"
+    return f"{index:05d}_{slug}"
+
+def save_page(archive_dir: str, key: str, name: str, html: str) -> None:
+    """Write an HTML snapshot into the archive.
+
+    Args:
+        archive_dir (str): Run directory returned by new_run_dir.
+        key (str): Property directory name returned by page_key.
+        name (str): File name, LISTING_PAGE or DETAIL_PAGE.
+        html (str): Page or element HTML to store.
+    """
+    try:
+        page_dir = Path(archive_dir) / key
+        page_dir.mkdir(parents=True, exist_ok=True)
+        # Listing cards are stored as fragments, so declare the encoding explicitly
+        # for Chrome when the file is opened from disk.
+        (page_dir / name).write_text('<meta charset="utf-8">\n' + html, encoding='utf-8')
+    except Exception as e:
+        print(f"Failed to archive {name} for {key}: {e}")
+
+def _create_offline_driver(driver_path: str) -> webdriver.Chrome:
+    """Start a headless Chrome that renders archived pages without scripts or network access."""
+    os.environ["PATH"] += os.pathsep + driver_path
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-extensions')
+    # Archived pages still reference stylesheets and images on remote hosts; fail every
+    # host lookup so a replay never goes to the network.
+    options.add_argument('--host-resolver-rules=MAP * ~NOTFOUND')
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.javascript": 2,
+        "profile.managed_default_content_settings.images": 2,
+    })
+    driver = webdriver.Chrome(options=options)
+    driver.implicitly_wait(0)
+    return driver
+
+def _reextract_page(driver, page_dir: Path) -> Optional[List]:
+    """Run the extractors over one archived property.
+
+    Card columns are read from the listing card and every other column from the detail
+    page, as in a live run. Runs that skipped the property page get "-1" for those columns.
+    """
+    listing_path = page_dir / LISTING_PAGE
+    if not listing_path.exists():
+        return None
+    run_info_path = page_dir.parent / RUN_INFO
+    adults = json.loads(run_info_path.read_text(encoding='utf-8')).get("adults") if run_info_path.exists() else None
+    driver.get(listing_path.resolve().as_uri())
+    deal_box = driver.find_element(By.CSS_SELECTOR, 'div[data-testid="property-card-container"]')
+    result = extract_listing_fields(deal_box, adults=adults)
+
+    detail_path = page_dir / DETAIL_PAGE
+    if detail_path.exists():
+        driver.get(detail_path.resolve().as_uri())
+        result.update(extract_detail_fields(driver, reviews_timeout=0))
+    return [result.get(column, "-1") for column in RESULT_COLUMNS] + [page_dir.parent.name]
+
+def _reextract_chunk(args) -> List[List]:
+    """Worker task: re-extract a batch of archived properties with its own browser."""
+    driver_path, page_dirs = args
+    rows = []
+    driver = _create_offline_driver(driver_path)
+    try:
+        for page_dir in page_dirs:
+            try:
+                row = _reextract_page(driver, Path(page_dir))
+                if row is not None:
+                    rows.append(row)
+            except Exception as e:
+                print(f"Error re-extracting {page_dir}: {e}")
+    finally:
+        driver.quit()
+    return rows
+
+def reextract_archive(archive_dir: str, output_path: str = 'output/booking_results_reextracted.csv',
+                      driver_path: str = r"C:\SeleniumDriver", processes: Optional[int] = None,
+                      max_chunk_size: int = 50) -> pd.DataFrame:
+    """Rebuild the dataset from archived HTML using a pool of headless browsers.
+
+    Args:
+        archive_dir (str): Root directory written by BookingScraper(archive_dir=...).
+        output_path (str): Where to save the rebuilt CSV.
+        driver_path (str): Path to the ChromeDriver executable.
+        processes (Optional[int]): Number of worker processes (default: all cores).
+        max_chunk_size (int): Upper bound on properties handled per browser session.
+
+    Returns:
+        pd.DataFrame: The re-extracted results, with a 'Run' column naming the run directory.
+    """
+    columns = RESULT_COLUMNS + ['Run']
+    if not Path(archive_dir).is_dir():
+        print(f"No archived pages found in {archive_dir}")
+        return pd.DataFrame(columns=columns)
+    page_dirs = sorted(
+        str(page_dir)
+        for run_dir in Path(archive_dir).iterdir() if run_dir.is_dir()
+        for page_dir in run_dir.iterdir() if page_dir.is_dir()
+    )
+    if not page_dirs:
+        print(f"No archived pages found in {archive_dir}")
+        return pd.DataFrame(columns=columns)
+
+    processes = min(processes or os.cpu_count() or 1, len(page_dirs))
+    chunk_size = max(1, min(max_chunk_size, math.ceil(len(page_dirs) / processes)))
+    print(f"Re-extracting {len(page_dirs)} archived properties with {processes} processes...")
+
+    chunks = [(driver_path, page_dirs[i:i + chunk_size]) for i in range(0, len(page_dirs), chunk_size)]
+    data = []
+    with Pool(processes) as pool:
+        for rows in pool.imap(_reextract_chunk, chunks):
+            data.extend(rows)
+        pool.close()
+        pool.join()
+
+    print(f"Re-extraction completed: {len(data)} observations rebuilt")
+    df = pd.DataFrame(data, columns=columns)
+    df.to_csv(output_path, index=False, encoding='utf-8')
+    return df
@@ -1,10 +1,28 @@
 # src/extractors.py
 import re
-from typing import List
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException
+from .utils import get_element_text, extract_review_count
+
+LISTING_COLUMNS = ['Name', 'District', 'Distance', 'Preferred', 'PreferredPlus', 'Rating', 'ReviewCount']
+REVIEW_COLUMNS = [
+    'StaffRating', 'FacilitiesRating', 'CleanlinessRating', 'ComfortRating', 'ValueRating',
+    'LocationRating', 'WifiRating'
+]
+FACILITY_COLUMNS = [
+    'TV', 'Wifi', 'Kitchen', 'Balcony', 'AC', 'SharedBathroom', 'PrivateBathroom', 'NoSmoking',
+    'Heating', 'Elevator', 'FreeParking', 'Refrigerator', 'Terrace', 'Hairdryer', 'DailyHousekeeping',
+    'Polish', 'English', 'German', 'Russian', 'Ukrainian', 'French', 'Spanish', 'Italian'
+]
+RESULT_COLUMNS = LISTING_COLUMNS + REVIEW_COLUMNS + FACILITY_COLUMNS + [
+    'Size', 'Transport', 'Attraction', 'Restaurant', 'CheckIn', 'CheckOut', 'Pets', 'PricePerPerson',
+    'CardPricePerPerson', 'Url'
+]
+CARD_COLUMNS = LISTING_COLUMNS + ['CardPricePerPerson', 'Url']
 
 def is_preferred(deal_box) -> bool:
     """Check if the property is Preferred (but not Preferred Plus)."""
@@ -34,10 +52,91 @@ def is_preferred_plus(deal_box) -> bool:
     except Exception:
         return False
 
-def get_reviews(driver) -> List[str]:
+def get_overall_rating(deal_box) -> str:
+    """Extract the overall rating shown on the listing card."""
+    try:
+        rating_box = deal_box.find_element(By.CSS_SELECTOR, 'div[class="a3b8729ab1 d86cee9b25"]')
+        match = re.search(r'\d+,\d+', rating_box.text.strip())
+        if match:
+            return match.group(0).replace(',', '.')
+        return "-1"
+    except Exception:
+        return "-1"
+
+def get_base_url(deal_box) -> str:
+    """Extract the property URL without query parameters."""
+    try:
+        return deal_box.find_element(By.CSS_SELECTOR, 'a').get_attribute('href').split('?')[0]
+    except Exception:
+        return ""
+
+def get_card_price_per_person(deal_box, adults: int) -> float:
+    """Extract the card's total price for the stay divided by the searched number of adults.
+
+    This is a different quantity from get_price_per_person, which reads the first room option
+    on the property page, so it is stored in its own 'CardPricePerPerson' column.
+    """
+    try:
+        price_text = get_element_text(deal_box, '[data-testid="price-and-discounted-price"]', "")
+        price_match = re.search(r'\d[\d\s\u00a0]*', price_text)
+        if price_match and adults:
+            return float(re.sub(r'\D', '', price_match.group(0))) / adults
+        return 0.0
+    except Exception:
+        return 0.0
+
+_LISTING_EXTRACTORS = {
+    'Name': lambda deal_box: get_element_text(deal_box, '[data-testid="title"]', ""),
+    'District': lambda deal_box: get_element_text(deal_box, '[data-testid="address"]', ""),
+    'Distance': lambda deal_box: get_element_text(deal_box, '[data-testid="distance"]', ""),
+    'Preferred': lambda deal_box: 1 if is_preferred(deal_box) else 0,
+    'PreferredPlus': lambda deal_box: 1 if is_preferred_plus(deal_box) else 0,
+    'Rating': get_overall_rating,
+    'ReviewCount': lambda deal_box: extract_review_count(
+        get_element_text(deal_box, 'div[class="abf093bdfe f45d8e4c32 d935416c47"]', "-1")),
+    'Url': get_base_url,
+}
+
+def plan_fields(fields: Optional[List[str]] = None) -> Tuple[List[str], List[str]]:
+    """Split the requested columns into those read from the listing card and those needing the detail page.
+
+    Args:
+        fields (Optional[List[str]]): Requested columns (default: all of RESULT_COLUMNS).
+
+    Returns:
+        Tuple[List[str], List[str]]: Listing card columns and detail page columns.
+    """
+    fields = list(fields) if fields else list(RESULT_COLUMNS)
+    unknown = [field for field in fields if field not in RESULT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {unknown}")
+    listing_fields = [field for field in fields if field in CARD_COLUMNS]
+    detail_fields = [field for field in fields if field not in CARD_COLUMNS]
+    return listing_fields, detail_fields
+
+def extract_listing_fields(deal_box, fields: Optional[List[str]] = None, adults: Optional[int] = None) -> Dict[str, Any]:
+    """Extract the attributes available on the listing card.
+
+    Args:
+        deal_box: The property card WebElement.
+        fields (Optional[List[str]]): Columns to extract (default: CARD_COLUMNS).
+        adults (Optional[int]): Number of adults, required for 'CardPricePerPerson'.
+
+    Returns:
+        Dict[str, Any]: Extracted values keyed by column name.
+    """
+    result = {}
+    for field in fields or CARD_COLUMNS:
+        if field == 'CardPricePerPerson':
+            result[field] = get_card_price_per_person(deal_box, adults)
+        else:
+            result[field] = _LISTING_EXTRACTORS[field](deal_box)
+    return result
+
+def get_reviews(driver, timeout: float = 20) -> List[str]:
     """Extract detailed review scores."""
     try:
-        WebDriverWait(driver, 20).until(
+        WebDriverWait(driver, timeout).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, 'div[class="c624d7469d f034cf5568 c69ad9b0c2 b57676889b c6198b324c a3214e5942"]'))
         )
         scores = {
@@ -84,6 +183,41 @@ def get_reviews(driver) -> List[str]:
     except Exception:
         return ["-1"] * 7
 
+def get_facilities(driver) -> List[str]:
+    """Extract facility and staff language flags from the property page."""
+    facilities = driver.find_elements(By.CSS_SELECTOR, 'span[class="a5a5a75131"]')
+    facility_texts = [facility.text.strip().lower() for facility in facilities]
+
+    utilities = [
+        "1" if any("telewizor" in text or "tv" in text for text in facility_texts) else "0",
+        "1" if any("wi-fi" in text or "bezpłatne wi-fi" in text for text in facility_texts) else "0",
+        "1" if any("kuchnia" in text or "płyta kuchenna" in text or "aneks kuchenny" in text for text in facility_texts) else "0",
+        "1" if "balkon" in facility_texts else "0",
+        "1" if "klimatyzacja" in facility_texts else "0",
+        "1" if "wspólna łazienka" in facility_texts else "0",
+        "1" if "prywatna łazienka" in facility_texts else "0",
+        "1" if "zakaz palenia" in facility_texts else "0",
+        "1" if "ogrzewanie" in facility_texts else "0",
+        "1" if "winda" in facility_texts else "0",
+        "1" if "bezpłatny parking" in facility_texts else "0",
+        "1" if "lodówka" in facility_texts else "0",
+        "1" if "taras" in facility_texts else "0",
+        "1" if "suszarka do włosów" in facility_texts else "0",
+        "1" if "codzienne sprzątanie" in facility_texts else "0",
+    ]
+
+    languages = [
+        "1" if "polski" in facility_texts else "0",
+        "1" if "angielski" in facility_texts else "0",
+        "1" if "niemiecki" in facility_texts else "0",
+        "1" if "rosyjski" in facility_texts else "0",
+        "1" if "ukraiński" in facility_texts else "0",
+        "1" if "francuski" in facility_texts else "0",
+        "1" if "hiszpański" in facility_texts else "0",
+        "1" if "włoski" in facility_texts else "0",
+    ]
+    return utilities + languages
+
 def get_size(driver) -> str:
     """Extract the room size."""
     try:
@@ -228,4 +362,38 @@ def get_price_per_person(driver) -> float:
             return float(price_match.group(1)) / int(persons_match.group(1))
         return 0.0
     except Exception:
-        return 0.0
\ No newline at end of file
+        return 0.0
+
+_DETAIL_EXTRACTORS = [
+    (['Size'], lambda driver: [get_size(driver)]),
+    (['Transport'], lambda driver: [get_nearest_transport(driver)]),
+    (['Attraction'], lambda driver: [get_nearest_attraction(driver)]),
+    (['Restaurant'], lambda driver: [get_nearest_restaurant(driver)]),
+    (['CheckIn'], lambda driver: [get_check_in(driver)]),
+    (['CheckOut'], lambda driver: [get_check_out(driver)]),
+    (['Pets'], lambda driver: [allows_pets(driver)]),
+    (['PricePerPerson'], lambda driver: [get_price_per_person(driver)]),
+]
+
+def extract_detail_fields(driver, reviews_timeout: float = 20, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Extract the attributes available on the property detail page.
+
+    Only the extractors needed for the requested columns are run.
+
+    Args:
+        driver: The WebDriver with the property page loaded.
+        reviews_timeout (float): Seconds to wait for the review scores to appear.
+        fields (Optional[List[str]]): Columns to extract (default: every column not on the listing card).
+
+    Returns:
+        Dict[str, Any]: Extracted values keyed by column name.
+    """
+    wanted = set(fields) if fields else set(RESULT_COLUMNS) - set(CARD_COLUMNS)
+    groups = [(REVIEW_COLUMNS, partial(get_reviews, timeout=reviews_timeout)),
+              (FACILITY_COLUMNS, get_facilities)] + _DETAIL_EXTRACTORS
+    result = {}
+    for columns, extractor in groups:
+        if wanted.intersection(columns):
+            values = extractor(driver)
+            result.update((column, value) for column, value in zip(columns, values) if column in wanted)
+    return result
@@ -1,8 +1,8 @@
 # src/scraper.py
 import os
-import re
 import time
-from typing import List
+from urllib.parse import urlparse, parse_qs
+from typing import List, Optional
 import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -10,35 +10,139 @@ from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, ElementClickInterceptedException
-from .utils import get_element_text, extract_review_count
-from .extractors import (is_preferred, is_preferred_plus, get_reviews, get_size,
-                        get_nearest_attraction, get_nearest_restaurant, get_nearest_transport,
-                        allows_pets, get_check_in, get_check_out, get_price_per_person)
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.remote_connection import ChromeRemoteConnection
+try:
+    from selenium.webdriver.common.driver_finder import DriverFinder
+    from selenium.webdriver.remote.client_config import ClientConfig
+except ImportError:
+    ClientConfig = None
+from .extractors import (RESULT_COLUMNS, REVIEW_COLUMNS, plan_fields, get_reviews, extract_listing_fields,
+                         extract_detail_fields)
+from .archive import LISTING_PAGE, DETAIL_PAGE, new_run_dir, page_key, save_page
+from .watchdog import DriverWatchdog, is_command_timeout
+from .store import ResultsStore
+
+# Extra time the HTTP client waits beyond the page load timeout, so a slow page load is
+# reported by chromedriver as a TimeoutException instead of being mistaken for a hang.
+COMMAND_TIMEOUT_MARGIN = 30
 
 class BookingScraper(webdriver.Chrome):
-    def __init__(self, driver_path: str = r"C:\SeleniumDriver", stay_open: bool = False):
+    def __init__(self, driver_path: str = r"C:\SeleniumDriver", stay_open: bool = False,
+                 archive_dir: Optional[str] = None, watchdog: Optional[DriverWatchdog] = None,
+                 store: Optional[ResultsStore] = None):
         """Initialize the BookingScraper with Chrome WebDriver.
 
         Args:
             driver_path (str): Path to the ChromeDriver executable.
             stay_open (bool): Whether to keep the browser open after scraping.
+            archive_dir (Optional[str]): Directory to store the HTML of every visited
+                listing card and detail page, for later re-extraction. Each call to
+                collect_results writes to its own run subdirectory.
+            watchdog (Optional[DriverWatchdog]): Bounds every WebDriver command, monitors memory
+                and open windows during collect_results and recycles the browser when a limit is crossed.
+            store (Optional[ResultsStore]): History store every collected run is appended to,
+                together with the search parameters.
         """
         print("Initializing BookingScraper...")
         self.driver_path = driver_path
         self.stay_open = stay_open
+        self.archive_dir = archive_dir
+        self.archive_run_dir = None
+        self.adults = None
+        self.watchdog = watchdog
+        self._command_timed_out = False
+        self.store = store
+        self.place_to_go = None
+        self.check_in_date = None
+        self.check_out_date = None
         os.environ["PATH"] += os.pathsep + self.driver_path
+        self._start_browser()
+
+    def _start_browser(self) -> None:
+        """Start a new Chrome session for this scraper."""
         options = webdriver.ChromeOptions()
         options.add_argument('--disable-gpu')
         options.add_argument('--no-sandbox')
         options.add_argument('--start-maximized')
         options.add_argument('--disable-extensions')
         try:
-            super().__init__(options=options)
+            if self.watchdog and ClientConfig is not None:
+                self._start_bounded_session(options, self.watchdog.max_command_seconds + COMMAND_TIMEOUT_MARGIN)
+            else:
+                if self.watchdog:
+                    print("Selenium has no ClientConfig, WebDriver commands will not be time-bounded")
+                super().__init__(options=options)
             print("WebDriver initialized successfully")
         except Exception as e:
             print(f"Failed to initialize WebDriver: {e}")
             raise
         self.implicitly_wait(5)
+        if self.watchdog:
+            self.set_page_load_timeout(self.watchdog.max_command_seconds)
+
+    def _start_bounded_session(self, options, timeout: float) -> None:
+        """Start chromedriver and a session whose HTTP client gives up on a command after the given time.
+
+        Args:
+            options: Chrome options for the session.
+            timeout (float): HTTP read timeout for commands sent to chromedriver.
+        """
+        service = Service()
+        service.path = DriverFinder(service, options).get_driver_path()
+        service.start()
+        self.service = service
+        client_config = ClientConfig(remote_server_addr=service.service_url, keep_alive=True, timeout=timeout)
+        executor = ChromeRemoteConnection(remote_server_addr=service.service_url, keep_alive=True,
+                                          client_config=client_config)
+        try:
+            webdriver.Remote.__init__(self, command_executor=executor, options=options)
+            self._is_remote = False
+        except Exception:
+            service.stop()
+            raise
+
+    def recycle_driver(self, url: str) -> None:
+        """Restart the browser and reopen the given page.
+
+        Args:
+            url (str): Page to restore after the restart, e.g. the search results URL.
+        """
+        print(f"Recycling WebDriver, restoring {url}")
+        try:
+            self.quit()
+        except Exception as e:
+            print(f"Failed to quit WebDriver cleanly: {e}")
+        self._start_browser()
+        self._command_timed_out = False
+        if self.watchdog:
+            self.watchdog.restarts += 1
+        try:
+            self.get(url)
+        except Exception as e:
+            print(f"Failed to restore page after restart: {e}")
+            return
+        try:
+            self._reject_cookies()
+        except Exception as e:
+            print(f"No cookie consent to reject after restart: {e}")
+        self.close_popup()
+
+    def _check_health(self, step: str, url: str) -> bool:
+        """Ask the watchdog about the session and recycle the driver if needed.
+
+        Returns:
+            bool: True if the driver was recycled.
+        """
+        if not self.watchdog:
+            return False
+        reason = self.watchdog.check(self, step, self._command_timed_out)
+        self._command_timed_out = False
+        if reason is None:
+            return False
+        print(f"Watchdog: {reason}")
+        self.recycle_driver(url)
+        return True
 
     def __enter__(self):
         return self
@@ -53,10 +157,7 @@ class BookingScraper(webdriver.Chrome):
         try:
             self.get("https://www.booking.com")
             print(f"Page loaded. Current URL: {self.current_url}")
-            WebDriverWait(self, 10).until(
-                EC.element_to_be_clickable((By.ID, "onetrust-reject-all-handler"))
-            ).click()
-            print("Cookie consent rejected")
+            self._reject_cookies()
         except TimeoutException:
             print("Timeout waiting for cookie consent button")
             print(f"Current URL: {self.current_url}")
@@ -64,6 +165,13 @@ class BookingScraper(webdriver.Chrome):
         except Exception as e:
             print(f"Failed to load first page: {e}")
 
+    def _reject_cookies(self) -> None:
+        """Reject the cookie consent banner."""
+        WebDriverWait(self, 10).until(
+            EC.element_to_be_clickable((By.ID, "onetrust-reject-all-handler"))
+        ).click()
+        print("Cookie consent rejected")
+
     def change_currency(self, currency: str = "PLN") -> None:
         """Change the currency on Booking.com.
 
@@ -118,12 +226,14 @@ class BookingScraper(webdriver.Chrome):
                 suggestion_text = suggestion.text.strip().lower()
                 if place_to_go.lower() in suggestion_text:
                     suggestion.click()
+                    self.place_to_go = place_to_go
                     print(f"Selected matching suggestion: '{suggestion.text.strip()}'")
                     return
 
             print(f"Warning: No exact match for '{place_to_go}', selecting first suggestion")
             if suggestions:
                 suggestions[0].click()
+                self.place_to_go = place_to_go
                 print(f"Selected first suggestion: '{suggestions[0].text.strip()}'")
             else:
                 print("No suggestions available to select")
@@ -147,6 +257,8 @@ class BookingScraper(webdriver.Chrome):
                 EC.element_to_be_clickable((By.CSS_SELECTOR, f'span[data-date="{check_in_date}"]'))
             ).click()
             self.find_element(By.CSS_SELECTOR, f'span[data-date="{check_out_date}"]').click()
+            self.check_in_date = check_in_date
+            self.check_out_date = check_out_date
             print("Dates selected")
         except Exception as e:
             print(f"Date selection failed: {e}")
@@ -167,6 +279,7 @@ class BookingScraper(webdriver.Chrome):
             decrease_btn.click()
             for _ in range(count - 1):
                 increase_btn.click()
+            self.adults = count
             print(f"Set to {count} adults")
         except Exception as e:
             print(f"Adult selection failed: {e}")
@@ -204,13 +317,35 @@ class BookingScraper(webdriver.Chrome):
         except Exception as e:
             print(f"Filter application failed: {e}")
 
-    def collect_results(self) -> pd.DataFrame:
-        """Collect hotel data from search results and return as a DataFrame."""
+    def collect_results(self, fields: Optional[List[str]] = None) -> pd.DataFrame:
+        """Collect hotel data from search results and return as a DataFrame.
+
+        Args:
+            fields (Optional[List[str]]): Columns to collect (default: all columns). Property pages
+                are only opened when a requested column is not available on the listing card, and
+                only the extractors needed for the requested columns are run. When a store is
+                attached, 'Url' is always collected so runs can be matched per property.
+        """
         print("Collecting results...")
+        columns = list(fields) if fields else list(RESULT_COLUMNS)
+        listing_fields, detail_fields = plan_fields(columns)
+        if self.store and 'Url' not in columns:
+            listing_fields.append('Url')
+            columns.append('Url')
+        if not detail_fields:
+            print("All requested fields are available on the listing cards, skipping property pages")
         data = []
         processed_urls = set()
         observation_count = 0
         start_time = time.time()
+        results_url = self.current_url
+        if self.adults is None:
+            self.adults = self._adults_from_url(results_url)
+        if 'CardPricePerPerson' in listing_fields and not self.adults:
+            print("Warning: number of adults is unknown, CardPricePerPerson will be 0.0 for every property")
+        if self.archive_dir:
+            self.archive_run_dir = new_run_dir(self.archive_dir, self.adults)
+            print(f"Archiving pages to {self.archive_run_dir}")
 
         try:
             print("Waiting for initial results to load...")
@@ -221,15 +356,7 @@ class BookingScraper(webdriver.Chrome):
         except TimeoutException:
             print("Timeout waiting for deal boxes. Current URL:", self.current_url)
             print("Page source snippet:", self.page_source[:500])
-            return pd.DataFrame(columns=[
-                'Name', 'District', 'Distance', 'Preferred', 'PreferredPlus', 'Rating', 'ReviewCount',
-                'StaffRating', 'FacilitiesRating', 'CleanlinessRating', 'ComfortRating', 'ValueRating',
-                'LocationRating', 'WifiRating', 'TV', 'Wifi', 'Kitchen', 'Balcony', 'AC', 'SharedBathroom',
-                'PrivateBathroom', 'NoSmoking', 'Heating', 'Elevator', 'FreeParking', 'Refrigerator',
-                'Terrace', 'Hairdryer', 'DailyHousekeeping', 'Polish', 'English', 'German', 'Russian',
-                'Ukrainian', 'French', 'Spanish', 'Italian', 'Size', 'Transport', 'Attraction',
-                'Restaurant', 'CheckIn', 'CheckOut', 'Pets', 'PricePerPerson'
-            ])
+            return pd.DataFrame(columns=columns)
 
         last_processed_count = 0
 
@@ -244,6 +371,8 @@ class BookingScraper(webdriver.Chrome):
             new_deal_boxes = deal_boxes[last_processed_count:]
             print(f"Processing {len(new_deal_boxes)} new deal boxes (skipping {last_processed_count} already processed)")
 
+            recycled = False
+            hung = False
             for box in new_deal_boxes:
                 try:
                     url = box.find_element(By.CSS_SELECTOR, 'a').get_attribute('href')
@@ -254,12 +383,29 @@ class BookingScraper(webdriver.Chrome):
                     processed_urls.add(base_url)
                     print(f"Processing new URL: {base_url}")
 
-                    self._extract_attributes(box, data)
+                    self._extract_attributes(box, data, listing_fields, detail_fields,
+                                             page_key(len(processed_urls), base_url))
                     observation_count += 1
                     print(f"Completed observation {observation_count}")
                 except Exception as e:
                     print(f"Error processing deal box: {e}")
-                    continue
+                    self._command_timed_out = self._command_timed_out or is_command_timeout(e)
+                timed_out = self._command_timed_out
+                if self._check_health("extract", results_url):
+                    recycled = True
+                    break
+                if timed_out:
+                    hung = True
+                    break
+
+            if hung:
+                print("WebDriver command timed out and the driver was not recycled, ending scrape")
+                break
+
+            if recycled:
+                # The restored page starts from the first batch again; processed_urls skips done properties.
+                last_processed_count = 0
+                continue
 
             last_processed_count = len(deal_boxes)
             print(f"Updated last_processed_count to {last_processed_count}")
@@ -293,6 +439,9 @@ class BookingScraper(webdriver.Chrome):
                             break
                         except Exception as e:
                             print(f"Failed to click 'Load more' button (attempt {attempt + 1}): {e}")
+                            if is_command_timeout(e):
+                                self._command_timed_out = True
+                                break
                             self.close_popup()
                             time.sleep(2)
                             if attempt == 2:
@@ -309,6 +458,15 @@ class BookingScraper(webdriver.Chrome):
                 break
             except Exception as e:
                 print(f"Load more error: {e}")
+                if not is_command_timeout(e):
+                    break
+                self._command_timed_out = True
+
+            timed_out = self._command_timed_out
+            if self._check_health("load more", results_url):
+                last_processed_count = 0
+            elif timed_out:
+                print("WebDriver command timed out and the driver was not recycled, ending scrape")
                 break
 
         end_time = time.time()
@@ -316,43 +474,39 @@ class BookingScraper(webdriver.Chrome):
         minutes, seconds = divmod(total_time, 60)
         print(f"Scraping completed: {observation_count} observations collected in {int(minutes)} minutes and {int(seconds)} seconds")
 
-        df = pd.DataFrame(data, columns=[
-            'Name', 'District', 'Distance', 'Preferred', 'PreferredPlus', 'Rating', 'ReviewCount',
-            'StaffRating', 'FacilitiesRating', 'CleanlinessRating', 'ComfortRating', 'ValueRating',
-            'LocationRating', 'WifiRating', 'TV', 'Wifi', 'Kitchen', 'Balcony', 'AC', 'SharedBathroom',
-            'PrivateBathroom', 'NoSmoking', 'Heating', 'Elevator', 'FreeParking', 'Refrigerator',
-            'Terrace', 'Hairdryer', 'DailyHousekeeping', 'Polish', 'English', 'German', 'Russian',
-            'Ukrainian', 'French', 'Spanish', 'Italian', 'Size', 'Transport', 'Attraction',
-            'Restaurant', 'CheckIn', 'CheckOut', 'Pets', 'PricePerPerson'
-        ])
+        df = pd.DataFrame(data, columns=columns)
         df.to_csv('output/booking_results.csv', index=False, encoding='utf-8')
+        if self.store:
+            try:
+                self.store.append_run(df, city=self.place_to_go, check_in=self.check_in_date,
+                                      check_out=self.check_out_date, adults=self.adults)
+            except Exception as e:
+                print(f"Failed to store results: {e}")
         return df
 
-    def _extract_attributes(self, deal_box, data: List) -> None:
+    @staticmethod
+    def _adults_from_url(url: str) -> Optional[int]:
+        """Read the number of adults from the 'group_adults' parameter of a search URL."""
+        try:
+            return int(parse_qs(urlparse(url).query)['group_adults'][0])
+        except (KeyError, IndexError, ValueError):
+            return None
+
+    def _extract_attributes(self, deal_box, data: List, listing_fields: List[str], detail_fields: List[str],
+                            archive_key: Optional[str] = None) -> None:
         """Extract attributes from a deal box and append to data list."""
-        result = []
+        result = {}
+        listing_done = False
         wait = WebDriverWait(self, 10)
 
         try:
-            result.append(get_element_text(deal_box, '[data-testid="title"]', ""))
-            result.append(get_element_text(deal_box, '[data-testid="address"]', ""))
-            result.append(get_element_text(deal_box, '[data-testid="distance"]', ""))
-            result.append(1 if is_preferred(deal_box) else 0)
-            result.append(1 if is_preferred_plus(deal_box) else 0)
-
-            overall_rating = "-1"
-            try:
-                rating_box = deal_box.find_element(By.CSS_SELECTOR, 'div[class="a3b8729ab1 d86cee9b25"]')
-                rating_text = rating_box.text.strip()
-                match = re.search(r'\d+,\d+', rating_text)
-                if match:
-                    overall_rating = match.group(0).replace(',', '.')
-            except Exception:
-                pass
-            result.append(overall_rating)
-
-            review_text = get_element_text(deal_box, 'div[class="abf093bdfe f45d8e4c32 d935416c47"]', "-1")
-            result.append(extract_review_count(review_text))
+            if self.archive_run_dir and archive_key:
+                save_page(self.archive_run_dir, archive_key, LISTING_PAGE, deal_box.get_attribute('outerHTML'))
+            result.update(extract_listing_fields(deal_box, listing_fields, self.adults))
+            listing_done = True
+            if not detail_fields:
+                data.append(result)
+                return
 
             title = deal_box.find_element(By.CSS_SELECTOR, '[data-testid="title"]')
             self.execute_script("arguments[0].scrollIntoView({block: 'center'});", title)
@@ -371,7 +525,7 @@ class BookingScraper(webdriver.Chrome):
                     time.sleep(2)
 
             if not clicked:
-                result.extend(["-1"] * (45 - len(result)))
+                result.update((field, "-1") for field in detail_fields)
                 data.append(result)
                 return
 
@@ -383,55 +537,22 @@ class BookingScraper(webdriver.Chrome):
             wait.until(EC.presence_of_all_elements_located((By.TAG_NAME, 'div')))
             time.sleep(2)
 
-            result.extend(get_reviews(self))
-            facilities = self.find_elements(By.CSS_SELECTOR, 'span[class="a5a5a75131"]')
-            facility_texts = [facility.text.strip().lower() for facility in facilities]
-
-            utilities = [
-                "1" if any("telewizor" in text or "tv" in text for text in facility_texts) else "0",
-                "1" if any("wi-fi" in text or "bezpłatne wi-fi" in text for text in facility_texts) else "0",
-                "1" if any("kuchnia" in text or "płyta kuchenna" in text or "aneks kuchenny" in text for text in facility_texts) else "0",
-                "1" if "balkon" in facility_texts else "0",
-                "1" if "klimatyzacja" in facility_texts else "0",
-                "1" if "wspólna łazienka" in facility_texts else "0",
-                "1" if "prywatna łazienka" in facility_texts else "0",
-                "1" if "zakaz palenia" in facility_texts else "0",
-                "1" if "ogrzewanie" in facility_texts else "0",
-                "1" if "winda" in facility_texts else "0",
-                "1" if "bezpłatny parking" in facility_texts else "0",
-                "1" if "lodówka" in facility_texts else "0",
-                "1" if "taras" in facility_texts else "0",
-                "1" if "suszarka do włosów" in facility_texts else "0",
-                "1" if "codzienne sprzątanie" in facility_texts else "0",
-            ]
-            result.extend(utilities)
-
-            languages = [
-                "1" if "polski" in facility_texts else "0",
-                "1" if "angielski" in facility_texts else "0",
-                "1" if "niemiecki" in facility_texts else "0",
-                "1" if "rosyjski" in facility_texts else "0",
-                "1" if "ukraiński" in facility_texts else "0",
-                "1" if "francuski" in facility_texts else "0",
-                "1" if "hiszpański" in facility_texts else "0",
-                "1" if "włoski" in facility_texts else "0",
-            ]
-            result.extend(languages)
-
-            result.append(get_size(self))
-            result.append(get_nearest_transport(self))
-            result.append(get_nearest_attraction(self))
-            result.append(get_nearest_restaurant(self))
-            result.append(get_check_in(self))
-            result.append(get_check_out(self))
-            result.append(allows_pets(self))
-            result.append(get_price_per_person(self))
+            result.update(extract_detail_fields(self, fields=detail_fields))
+
+            if self.archive_run_dir and archive_key and self.current_window_handle != original_window:
+                # The review scores load late; wait for them even when they were not requested so
+                # the snapshot is complete for re-extraction.
+                if not set(detail_fields) & set(REVIEW_COLUMNS):
+                    get_reviews(self)
+                save_page(self.archive_run_dir, archive_key, DETAIL_PAGE, self.page_source)
 
             data.append(result)
         except Exception as e:
             print(f"Error extracting attributes: {e}")
-            if len(result) >= 7:
-                result.extend(["-1"] * (45 - len(result)))
+            self._command_timed_out = self._command_timed_out or is_command_timeout(e)
+            if listing_done:
+                for field in detail_fields:
+                    result.setdefault(field, "-1")
                 data.append(result)
         finally:
             if len(self.window_handles) > 1:
@@ -0,0 +1,146 @@
+# src/store.py
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Optional
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scraped_at TEXT NOT NULL,
+    city TEXT,
+    check_in TEXT,
+    check_out TEXT,
+    adults INTEGER,
+    observations INTEGER
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    scraped_at TEXT NOT NULL,
+    base_url TEXT,
+    name TEXT,
+    city TEXT,
+    check_in TEXT,
+    check_out TEXT,
+    rating REAL,
+    review_count INTEGER,
+    price_per_person REAL,
+    card_price_per_person REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_url ON results (base_url, scraped_at);
+CREATE INDEX IF NOT EXISTS idx_results_city ON results (city, check_in);
+CREATE INDEX IF NOT EXISTS idx_results_check_in ON results (check_in);
+"""
+
+def _to_number(value, cast=float):
+    """Convert a scraped value to a number, treating "-1" and blanks as missing."""
+    try:
+        number = cast(str(value).replace(',', '.').strip())
+    except (TypeError, ValueError):
+        return None
+    return None if number < 0 else number
+
+class ResultsStore:
+    def __init__(self, path: str = 'output/booking_history.sqlite'):
+        """Open (or create) the SQLite store holding every scraping run.
+
+        Args:
+            path (str): Path to the SQLite database file.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.connection.close()
+
+    def append_run(self, df: pd.DataFrame, city: Optional[str] = None, check_in: Optional[str] = None,
+                   check_out: Optional[str] = None, adults: Optional[int] = None,
+                   scraped_at: Optional[str] = None) -> int:
+        """Append the results of one run together with its search parameters.
+
+        Args:
+            df (pd.DataFrame): Results returned by BookingScraper.collect_results.
+            city (Optional[str]): Searched destination.
+            check_in (Optional[str]): Check-in date in YYYY-MM-DD format.
+            check_out (Optional[str]): Check-out date in YYYY-MM-DD format.
+            adults (Optional[int]): Number of adults.
+            scraped_at (Optional[str]): ISO timestamp of the run (default: now).
+
+        Returns:
+            int: The id of the stored run.
+        """
+        scraped_at = scraped_at or datetime.now().isoformat(timespec='seconds')
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (scraped_at, city, check_in, check_out, adults, observations) VALUES (?, ?, ?, ?, ?, ?)",
+                (scraped_at, city, check_in, check_out, adults, len(df))
+            )
+            run_id = cursor.lastrowid
+            rows = []
+            for record in df.to_dict(orient='records'):
+                price = _to_number(record.get('PricePerPerson'))
+                card_price = _to_number(record.get('CardPricePerPerson'))
+                rows.append((
+                    run_id, scraped_at, record.get('Url'), record.get('Name'), city, check_in, check_out,
+                    _to_number(record.get('Rating')),
+                    _to_number(record.get('ReviewCount'), int),
+                    price if price else None,
+                    card_price if card_price else None,
+                    json.dumps(record, ensure_ascii=False, default=str),
+                ))
+            self.connection.executemany(
+                "INSERT INTO results (run_id, scraped_at, base_url, name, city, check_in, check_out, "
+                "rating, review_count, price_per_person, card_price_per_person, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        print(f"Stored run {run_id} with {len(rows)} observations in {self.path}")
+        return run_id
+
+    def property_history(self, base_url: str, days: Optional[int] = None) -> pd.DataFrame:
+        """Return the price and rating time series of a property.
+
+        Args:
+            base_url (str): Property URL without query parameters.
+            days (Optional[int]): Only include runs from the last N days (default: all runs).
+
+        Returns:
+            pd.DataFrame: One row per observation, ordered by scrape time.
+        """
+        query = ("SELECT scraped_at, check_in, check_out, price_per_person, card_price_per_person, "
+                 "rating, review_count FROM results WHERE base_url = ?")
+        params = [base_url]
+        if days is not None:
+            query += " AND scraped_at >= ?"
+            params.append((datetime.now() - timedelta(days=days)).isoformat(timespec='seconds'))
+        query += " ORDER BY scraped_at"
+        return pd.read_sql_query(query, self.connection, params=params)
+
+    def stay_results(self, city: str, check_in: Optional[str] = None) -> pd.DataFrame:
+        """Return all stored observations for a city, optionally for a single check-in date.
+
+        Args:
+            city (str): Searched destination as passed to append_run.
+            check_in (Optional[str]): Check-in date in YYYY-MM-DD format.
+
+        Returns:
+            pd.DataFrame: Observations ordered by check-in date and scrape time.
+        """
+        query = ("SELECT scraped_at, base_url, name, check_in, check_out, price_per_person, "
+                 "card_price_per_person, rating, review_count FROM results WHERE city = ?")
+        params = [city]
+        if check_in is not None:
+            query += " AND check_in = ?"
+            params.append(check_in)
+        query += " ORDER BY check_in, scraped_at"
+        return pd.read_sql_query(query, self.connection, params=params)
@@ -0,0 +1,86 @@
+# src/watchdog.py
+import socket
+from typing import Optional
+from urllib3.exceptions import MaxRetryError, TimeoutError as HTTPTimeoutError
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+def is_command_timeout(error: Exception) -> bool:
+    """Check whether an exception is a WebDriver command cut off by the connection timeout."""
+    if isinstance(error, MaxRetryError):
+        # Idempotent commands (GET) are retried by urllib3 before the timeout surfaces.
+        error = error.reason
+    return isinstance(error, (HTTPTimeoutError, socket.timeout))
+
+class DriverWatchdog:
+    def __init__(self, max_rss_mb: float = 2048, max_windows: int = 1, max_command_seconds: float = 60,
+                 max_restarts: int = 10):
+        """Track the health of a long-running Chrome session.
+
+        Args:
+            max_rss_mb (float): Combined resident memory of chromedriver and its browser
+                processes above which the driver is recycled. Requires psutil.
+            max_windows (int): Number of open windows allowed between steps.
+            max_command_seconds (float): Page load timeout. Any other WebDriver command is
+                aborted after this limit plus a safety margin, and the driver is recycled.
+            max_restarts (int): Maximum number of restarts per session, so a limit that is
+                crossed again right after a restart cannot loop forever.
+        """
+        self.max_rss_mb = max_rss_mb
+        self.max_windows = max_windows
+        self.max_command_seconds = max_command_seconds
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self._budget_warned = False
+        if psutil is None:
+            print("psutil is not installed, browser memory will not be monitored")
+
+    def browser_rss_mb(self, driver) -> Optional[float]:
+        """Return the combined RSS of chromedriver and all its child processes in MB."""
+        if psutil is None:
+            return None
+        try:
+            process = psutil.Process(driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            total = 0
+            for proc in processes:
+                try:
+                    total += proc.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+            return total / (1024 * 1024)
+        except Exception:
+            return None
+
+    def check(self, driver, step: str, command_timed_out: bool = False) -> Optional[str]:
+        """Check the session after a step.
+
+        Args:
+            driver: The WebDriver to inspect.
+            step (str): Name of the step that just finished, used in the report.
+            command_timed_out (bool): Whether a WebDriver command timed out during the step.
+
+        Returns:
+            Optional[str]: Reason to recycle the driver, or None if the session is healthy.
+        """
+        if self.restarts >= self.max_restarts:
+            if not self._budget_warned:
+                print(f"Watchdog: restart budget of {self.max_restarts} exhausted, "
+                      "monitoring is off for the rest of the session")
+                self._budget_warned = True
+            return None
+        if command_timed_out:
+            return f"a WebDriver command in step '{step}' hung for over {self.max_command_seconds}s"
+        try:
+            windows = len(driver.window_handles)
+        except Exception as e:
+            return f"browser not responding: {e}"
+        if windows > self.max_windows:
+            return f"{windows} windows open (limit {self.max_windows})"
+        rss = self.browser_rss_mb(driver)
+        if rss is not None and rss > self.max_rss_mb:
+            return f"browser memory at {rss:.0f} MB (limit {self.max_rss_mb} MB)"
+        return None